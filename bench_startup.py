@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+import os
+import sys
+import subprocess
+import statistics
+import time
+import click
+from utils.engines import engine_names
+
+
+def _time_cmd(cmd, runs):
+    """Run cmd runs times and return the wall-clock durations in milliseconds."""
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            cmd,
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+@click.command()
+@click.option(
+    "-n",
+    "--runs",
+    "runs",
+    type=int,
+    default=10,
+    show_default=True,
+    help="Number of runs per measurement",
+)
+def main(runs):
+    """Measure pdfmd.py startup time and the import cost of each engine."""
+    scripts_dir = os.path.dirname(os.path.abspath(__file__))
+    cases = [
+        ("python (baseline)", [sys.executable, "-c", "pass"]),
+        (
+            "pdfmd.py --help",
+            [sys.executable, os.path.join(scripts_dir, "pdfmd.py"), "--help"],
+        ),
+    ]
+    for name in engine_names():
+        cases.append(
+            (
+                f"pdfmd.py + {name} import",
+                [
+                    sys.executable,
+                    "-c",
+                    "import pdfmd; from utils.engines import get_engine;"
+                    f"get_engine('{name}')",
+                ],
+            )
+        )
+
+    click.echo(f"[INFO] Startup benchmark ({runs} runs each)")
+    for label, cmd in cases:
+        try:
+            durations = _time_cmd(cmd, runs)
+        except subprocess.CalledProcessError as e:
+            click.echo(f"[WARN] {label}: failed ({e})")
+            continue
+        click.echo(
+            f"{label:<32} min {min(durations):8.1f} ms"
+            f"  median {statistics.median(durations):8.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
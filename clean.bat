@@ -1,6 +1,7 @@
 @echo off
 REM Clean up generated PDF, Markdown, and PNG files in the current directory
 del /Q "*_pdfmd.md"
+del /Q "*_pdfmd.json"
 del /Q "*_pdfcrop_*.pdf"
 del /Q "*_pdfsplit_*.pdf"
 del /Q "*_excelpdf_*.pdf"
@@ -9,4 +10,10 @@ FOR %%F IN (*.md) DO (
     IF /I NOT "%%~nxF"=="README.md" DEL /Q "%%F"
 )
 del /Q "*.png"
+del /Q "*.webp"
+del /Q "*_pdfcrop_*_manifest.json"
+REM Delete per-document workspaces left by failed runs
+IF EXIST ".pdfmd_work" RMDIR /S /Q ".pdfmd_work"
+REM Delete profiles written by main.py --profile
+FOR /D %%D IN (pdfmd_profile_*) DO RMDIR /S /Q "%%D"
 echo Cleanup complete.
\ No newline at end of file
@@ -1,12 +1,228 @@
 #!/usr/bin/env python
 import os
 import sys
+import json
+import shutil
+import hashlib
 import subprocess
 from time import sleep
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import click
 import fitz
+import time
 import glob
 import re  # for sorting markdown files
+from utils.engines import engine_names, engine_target, validate_engine
+from utils.boilerplate_utils import (
+    compile_rules,
+    load_rules,
+    scan_layouts,
+    strip_boilerplate,
+)
+from utils.plan_utils import classify_document, estimate, record_throughput
+from utils.profile_utils import PROFILE_DIR_ENV, profile_stage, merge_profiles
+
+# Per-document scratch workspaces live under this folder
+WORK_DIR = ".pdfmd_work"
+# Conversion attempts per page, and wait between them to avoid rate limit
+MAX_ATTEMPTS = 3
+RETRY_WAIT = 15
+# Cropped images and their manifests are kept when a workspace is removed
+IMAGE_OUTPUTS = ("*.png", "*.webp", "*_manifest.json")
+
+
+def workspace_for(input_pdf: str) -> str:
+    """
+    Return the scratch workspace for a document, creating it if needed.
+    The folder name includes a hash of the absolute input path, so documents
+    with the same basename in different folders never share intermediates,
+    and a hash of the file's size and mtime, so re-running the same unchanged
+    document resumes from its workspace. Workspaces left by an older version
+    of the file are removed, their page Markdown no longer applies.
+    """
+    workspace = workspace_path(input_pdf)
+    for old in glob.glob(glob.escape(workspace.rsplit("_", 1)[0]) + "_*"):
+        if old != workspace and os.path.isdir(old):
+            shutil.rmtree(old)
+            click.echo(f"[INFO] Input changed, removed old workspace {old}")
+    os.makedirs(workspace, exist_ok=True)
+    return workspace
+
+
+def workspace_path(input_pdf: str) -> str:
+    """Return the workspace folder of a document, <base>_<path hash>_<file state hash>."""
+    base = os.path.splitext(os.path.basename(input_pdf))[0]
+    path = os.path.abspath(input_pdf)
+    st = os.stat(path)
+    path_digest = hashlib.sha1(path.encode("utf-8")).hexdigest()
+    state_digest = hashlib.sha1(f"{st.st_size}:{st.st_mtime_ns}".encode()).hexdigest()
+    return os.path.abspath(
+        os.path.join(WORK_DIR, f"{base}_{path_digest[:8]}_{state_digest[:8]}")
+    )
+
+
+def convert_page(pdf: str, engine: str, quiet: bool) -> tuple:
+    """
+    Convert a single page PDF to Markdown via pdfmd.py, retrying on failure.
+    Returns (markdown path, seconds of the successful attempt or None if skipped).
+    """
+    md = os.path.splitext(pdf)[0] + "_pdfmd.md"
+    if os.path.isfile(md):
+        click.echo(f"[INFO] Markdown already exists: {md}")
+        return md, None
+
+    md_cmd = [
+        sys.executable,
+        os.path.join(os.path.dirname(__file__), "pdfmd.py"),
+        "-i",
+        pdf,
+        "-e",
+        engine,
+        "--engine-target",
+        engine_target(engine),
+    ]
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        if attempt > 1:
+            click.echo(
+                f"[INFO] Retrying {pdf} ({attempt}/{MAX_ATTEMPTS}), "
+                f"waiting {RETRY_WAIT}s to avoid rate limit..."
+            )
+            sleep(RETRY_WAIT)
+        else:
+            click.echo(f"[INFO] Converting {pdf} to Markdown...")
+        # pdfmd.py reports errors without a non-zero exit, so check the output
+        start = time.perf_counter()
+        proc = subprocess.run(
+            md_cmd,
+            cwd=os.path.dirname(pdf),
+            capture_output=quiet,
+            text=True,
+        )
+        if os.path.isfile(md):
+            return md, time.perf_counter() - start
+        reason = proc.stdout.strip().splitlines()[-1:] if quiet else []
+        click.echo(
+            f"ERROR: Failed to convert {pdf} to Markdown. {' '.join(reason)}",
+            err=True,
+        )
+    raise click.ClickException(f"Failed to convert {pdf} after {MAX_ATTEMPTS} attempts")
+
+
+def combine_markdown(md_files: list, combined: str, rules: dict) -> None:
+    """Combine page Markdown files into one, stripping repeated headers/footers."""
+    # find lines repeating at the same page position (headers, footers,
+    # page numbers, banners) from the position data the engines wrote
+    with profile_stage("combine"):
+        page_edges, edge_counts = scan_layouts(md_files, rules)
+        seen_edges = set()
+        patterns = compile_rules(rules)
+        with open(combined, "w", encoding="utf-8") as fout:
+            for md, edges in zip(md_files, page_edges):
+                click.echo(f"[INFO] Adding {os.path.basename(md)} to {combined}")
+                with open(md, "r", encoding="utf-8") as fin:
+                    # Trim repeated headers/footers and ":selected:" marks
+                    for line in strip_boilerplate(
+                        fin, edges, edge_counts, seen_edges, rules, patterns
+                    ):
+                        fout.write(line)
+                    fout.write("\n\n")
+    click.echo(f"[INFO] Combined Markdown saved as {combined}")
+
+
+def output_names(inputs: list) -> list:
+    """
+    Return a unique output name per input (absolute, deduplicated) path.
+    Names are the basename; inputs sharing a basename are prefixed with as many
+    parent folder names as needed to tell them apart (x/a/report.pdf and
+    y/a/report.pdf become x_a_report and y_a_report), falling back to the
+    workspace path hash if folder names still clash.
+    """
+    parts = [os.path.normpath(p).split(os.sep) for p in inputs]
+    bases = [os.path.splitext(p[-1])[0] for p in parts]
+    depths = [0] * len(inputs)
+    while True:
+        names = [
+            "_".join(
+                [c for c in parts[i][len(parts[i]) - 1 - depths[i] : -1] if c] + [b]
+            )
+            for i, b in enumerate(bases)
+        ]
+        clashing = [i for i, name in enumerate(names) if names.count(name) > 1]
+        if not clashing:
+            break
+        deeper = [i for i in clashing if depths[i] < len(parts[i]) - 1]
+        if not deeper:
+            for i in clashing:
+                names[i] = os.path.basename(workspace_path(inputs[i]))
+            break
+        for i in deeper:
+            depths[i] += 1
+    return names
+
+
+def output_name(doc: dict, filename: str) -> str:
+    """Replace the <base> prefix of a workspace file name with the document's output name."""
+    if doc["name"] != doc["base"] and filename.startswith(doc["base"]):
+        return doc["name"] + filename[len(doc["base"]) :]
+    return filename
+
+
+def finish_document(doc: dict, rules: dict) -> None:
+    """Combine a converted document, keep its cropped images and remove its workspace."""
+    md_files = [os.path.splitext(pdf)[0] + "_pdfmd.md" for pdf in doc["pages"]]
+    combine_markdown(md_files, doc["combined"], rules)
+    for pattern in IMAGE_OUTPUTS:
+        for path in glob.glob(os.path.join(doc["workspace"], pattern)):
+            target = output_name(doc, os.path.basename(path))
+            shutil.move(path, target)
+            if target.endswith("_manifest.json") and doc["name"] != doc["base"]:
+                # keep the manifest pointing at the renamed image files
+                with open(target, "r", encoding="utf-8") as f:
+                    entries = json.load(f)
+                for entry in entries:
+                    entry["file"] = output_name(doc, entry["file"])
+                with open(target, "w", encoding="utf-8") as f:
+                    json.dump(entries, f, ensure_ascii=False, indent=2)
+    shutil.rmtree(doc["workspace"])
+    click.echo(f"[INFO] Removed workspace {doc['workspace']}")
+
+
+def format_duration(seconds: float) -> str:
+    """Format seconds as e.g. 2h 05m 09s."""
+    minutes, secs = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes:02d}m {secs:02d}s"
+
+
+def print_plan(docs: list, engine: str, workers: int) -> None:
+    """Print the dry-run estimate of pages, Azure calls, cost and runtime."""
+    for d in docs:
+        classes = d["classes"]
+        click.echo(
+            f"[PLAN] {d['input']}: {len(classes)} pages "
+            f"(text {classes.count('text')}, table {classes.count('table')}, "
+            f"scanned {classes.count('scanned')})"
+        )
+    try:
+        plan = estimate([d["classes"] for d in docs], engine, workers)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"[PLAN] Engine: {engine}, workers: {workers}")
+    click.echo(f"[PLAN] Documents: {plan['documents']}, pages: {plan['pages']}")
+    for c, n in plan["classes"].items():
+        click.echo(f"[PLAN]   {c}: {n} pages ({plan['sources'][c]} throughput)")
+    click.echo(f"[PLAN] Azure page transactions: {plan['azure_transactions']}")
+    click.echo(f"[PLAN] S3 uploads (at most): {plan['s3_uploads_max']}")
+    click.echo(f"[PLAN] Estimated Azure cost: ${plan['cost_usd']:.2f}")
+    click.echo(
+        f"[PLAN] Estimated wall-clock time: {format_duration(plan['wall_seconds'])} "
+        f"({format_duration(plan['serial_seconds'])} of page conversion)"
+    )
+    if engine == "pdfplumber" and plan["classes"]["scanned"]:
+        click.echo(
+            f"[WARN] {plan['classes']['scanned']} scanned pages have no text layer, "
+            "pdfplumber cannot extract them"
+        )
 
 
 @click.command()
@@ -30,12 +246,47 @@ import re  # for sorting markdown files
     "-e",
     "--engine",
     "engine",
-    type=click.Choice(["azureai", "pdfplumber"], case_sensitive=False),
     default="azureai",
-    help="Extraction engine to use when calling pdfmd.py (azureai or pdfplumber)",
+    callback=validate_engine,
+    help="Extraction engine to use when calling pdfmd.py ("
+    + ", ".join(engine_names())
+    + " or a plugin engine)",
 )
-def main(input_pdfs, crop, engine):
+@click.option(
+    "--strip-rules",
+    "strip_rules",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="JSON file overriding the header/footer stripping rules used in Phase 3",
+)
+@click.option(
+    "-w",
+    "--workers",
+    "workers",
+    type=click.IntRange(min=1),
+    default=4,
+    show_default=True,
+    help="Maximum number of pages converted at the same time, across all documents",
+)
+@click.option(
+    "--plan",
+    "plan",
+    is_flag=True,
+    default=False,
+    help="Only estimate pages, Azure calls, cost and runtime, then exit",
+)
+@click.option(
+    "--profile",
+    "profile",
+    is_flag=True,
+    default=False,
+    help="Profile split, extraction, Azure parsing and combine (including child "
+    "processes) into a pdfmd_profile_<time> folder",
+)
+def main(input_pdfs, crop, engine, strip_rules, workers, plan, profile):
     """Crop all pages (if requested) then convert to Markdown for multiple PDFs or folders."""
+    rules = load_rules(strip_rules)
+
     # Expand input_pdfs: if any entry is a directory, add all PDFs in that directory
     expanded_inputs = []
 
@@ -48,24 +299,64 @@ def main(input_pdfs, crop, engine):
         else:
             expanded_inputs.append(inp)
 
-    for input_pdf in expanded_inputs:
-        click.echo(f"[INFO] Processing: {input_pdf}")
-        base = os.path.splitext(os.path.basename(input_pdf))[0]
-        scripts_dir = os.path.dirname(__file__)
+    # Drop inputs given more than once (e.g. a folder and a file in it), they
+    # would share one workspace and remove it under each other
+    unique_inputs = {}
+    for inp in expanded_inputs:
+        unique_inputs.setdefault(os.path.normcase(os.path.abspath(inp)), inp)
+    if len(unique_inputs) < len(expanded_inputs):
+        click.echo(
+            f"[INFO] Skipped {len(expanded_inputs) - len(unique_inputs)} "
+            "duplicate input(s)"
+        )
+    expanded_inputs = list(unique_inputs.values())
 
-        # Phase 1: Split pages
-        splited_pdfs = []
-        if crop:
-            click.echo("[INFO] Counting pages via PyMuPDF...")
+    # Count pages (and classify them for --plan), and schedule largest
+    # documents first to minimize total runtime
+    click.echo("[INFO] Counting pages via PyMuPDF...")
+    docs = []
+    for input_pdf in expanded_inputs:
+        d = {
+            "input": os.path.abspath(input_pdf),
+            "base": os.path.splitext(os.path.basename(input_pdf))[0],
+        }
+        if plan:
+            d["classes"] = classify_document(input_pdf)
+            d["num_pages"] = len(d["classes"])
+        else:
             doc = fitz.open(input_pdf)
-            num_pages = doc.page_count
+            d["num_pages"] = doc.page_count
             doc.close()
-            click.echo(f"[INFO] PDF has {num_pages} pages.")
-            cropped_pdfs = []
+        docs.append(d)
+        click.echo(f"[INFO] {input_pdf} has {d['num_pages']} pages.")
+    docs.sort(key=lambda d: d["num_pages"], reverse=True)
+
+    if plan:
+        print_plan(docs, engine.lower(), workers)
+        return
+
+    # Child scripts inherit the profile directory through the environment
+    if profile:
+        profile_path = os.path.abspath(time.strftime("pdfmd_profile_%Y%m%d_%H%M%S"))
+        os.makedirs(profile_path, exist_ok=True)
+        os.environ[PROFILE_DIR_ENV] = profile_path
+        click.echo(f"[INFO] Profiling into {profile_path}")
+
+    for d, name in zip(docs, output_names([d["input"] for d in docs])):
+        d["name"] = name
+        d["combined"] = f"{name}_pdfmd.md"
+
+    scripts_dir = os.path.dirname(__file__)
+    for d in docs:
+        click.echo(f"[INFO] Processing: {d['input']}")
+        d["workspace"] = workspace_for(d["input"])
 
-            for i in range(1, num_pages + 1):
+        # Phase 1: Split pages into the document workspace
+        if crop:
+            cropped_pdfs = []
+            for i in range(1, d["num_pages"] + 1):
                 # Check the pdfcrop file exists, if exists, skip the cropping
-                out_pdf = f"{base}_pdfcrop_{i}.pdf"
+                out_pdf = os.path.join(d["workspace"], f"{d['base']}_pdfcrop_{i}.pdf")
                 if os.path.isfile(out_pdf):
                     click.echo(f"[INFO] Cropped PDF already exists: {out_pdf}")
                     cropped_pdfs.append(out_pdf)
@@ -76,15 +367,14 @@ def main(input_pdfs, crop, engine):
                     sys.executable,
                     os.path.join(scripts_dir, "pdfcrop.py"),
                     "-i",
-                    input_pdf,
+                    d["input"],
                     "--page",
                     str(i),
                 ]
-                subprocess.run(crop_cmd, check=True)
+                subprocess.run(crop_cmd, check=True, cwd=d["workspace"])
                 # pdfcrop.py already names output as <base>_pdfcrop_<page>.pdf
-                out_pdf = f"{base}_pdfcrop_{i}.pdf"
                 cropped_pdfs.append(out_pdf)
-                splited_pdfs = sorted(cropped_pdfs)
+            d["pages"] = cropped_pdfs
 
         else:
             # Split input PDF into single page PDF with pdfsplit.py
@@ -93,101 +383,90 @@ def main(input_pdfs, crop, engine):
                 sys.executable,
                 os.path.join(scripts_dir, "pdfsplit.py"),
                 "-i",
-                input_pdf,
+                d["input"],
             ]
-            subprocess.run(split_cmd, check=True)
+            subprocess.run(split_cmd, check=True, cwd=d["workspace"])
 
             # pdfsplit.py names output as <base>_pdfsplit_<page>.pdf
             # Collect all split PDFs
-            splited_pdfs = sorted(
-                glob.glob(f"{base}_pdfsplit_*.pdf"),
+            d["pages"] = sorted(
+                glob.glob(os.path.join(d["workspace"], f"{d['base']}_pdfsplit_*.pdf")),
                 key=lambda x: int(re.search(r"_pdfsplit_(\d+)\.pdf$", x).group(1)),
             )
-            click.echo(f"[INFO] Split PDFs: {splited_pdfs}")
-
-        # Phase 2: convert cropped PDFs to Markdown
-        # Confirm before proceeding to Phase 2
-        if not click.confirm(
-            f"[CONFIRM] Proceed to Phase 2: convert cropped PDFs to Markdown for {input_pdf}?",
-            default=True,
-        ):
-            click.echo("[ABORT] Phase 2 cancelled. Exiting.")
-            sys.exit(0)
-        click.echo("[INFO] Phase 2: converting cropped PDFs to Markdown...")
-        # Retry loop on conversion failure: only skip the very first wait
-        first_try = True
-        for pdf in splited_pdfs:
-            while True:
-                if first_try:
-                    click.echo(f"[INFO] Converting {pdf} to Markdown...")
-                    first_try = False
-                else:
-                    click.echo(
-                        f"[INFO] Converting {pdf} to Markdown... (waiting 15s to avoid rate limit)"
-                    )
-                    sleep(15)
-                md_cmd = [
-                    sys.executable,
-                    os.path.join(scripts_dir, "pdfmd.py"),
-                    "-i",
-                    pdf,
-                    "-e",
-                    engine,
-                ]
-                try:
-                    subprocess.run(md_cmd, check=True)
-                    break  # success, move to next PDF
-                except Exception as e:
-                    click.echo(
-                        f"ERROR: Failed to convert {pdf} to Markdown. Reason: {e}",
-                        err=True,
-                    )
-                    # Prompt to retry or abort
-                    if click.confirm("Retry conversion of this file?", default=False):
-                        continue
-                    else:
-                        click.echo("Aborting Phase 2.")
-                        sys.exit(1)
-
-        # Phase 3: combine Markdown files
-        # Confirm before proceeding to Phase 3
-        if click.confirm(
-            f"[CONFIRM] Proceed to Phase 3: combine Markdown files for {input_pdf}?",
-            default=True,
-        ):
-            click.echo("[INFO] Phase 3: combining Markdown files...")
-            # collect and sort markdown files by page index
-            if crop:
-                md_files = sorted(
-                    glob.glob("*_pdfcrop_*_pdfmd.md"),
-                    key=lambda x: int(
-                        re.search(r"_pdfcrop_(\d+)_pdfmd\.md$", x).group(1)
-                    ),
-                )
-            else:
-                md_files = sorted(
-                    glob.glob("*_pdfsplit_*_pdfmd.md"),
-                    key=lambda x: int(
-                        re.search(r"_pdfsplit_(\d+)_pdfmd\.md$", x).group(1)
-                    ),
+            click.echo(f"[INFO] Split {len(d['pages'])} pages into {d['workspace']}")
+
+    # Phase 2: convert single page PDFs to Markdown
+    # Confirm before proceeding to Phase 2
+    total_pages = sum(len(d["pages"]) for d in docs)
+    if not click.confirm(
+        f"[CONFIRM] Proceed to Phase 2: convert {total_pages} pages of "
+        f"{len(docs)} document(s) to Markdown with {workers} worker(s)?",
+        default=True,
+    ):
+        click.echo("[ABORT] Phase 2 cancelled. Exiting.")
+        sys.exit(0)
+    click.echo("[INFO] Phase 2: converting PDFs to Markdown...")
+
+    # Pages of all documents share one worker pool; documents are queued
+    # largest first. Phase 3 runs for each document as soon as it is done.
+    failed = []
+    samples = []  # (engine, page class, seconds) for the --plan estimates
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for d in docs:
+            d["remaining"] = len(d["pages"])
+            d["failed"] = False
+            for pdf in d["pages"]:
+                future = pool.submit(convert_page, pdf, engine, workers > 1)
+                futures[future] = (d, pdf)
+            if not d["pages"]:
+                click.echo(f"[WARN] No pages to convert for {d['input']}")
+
+        for future in as_completed(futures):
+            d, pdf = futures[future]
+            try:
+                _, seconds = future.result()
+                if seconds is not None:
+                    # classify only converted pages, as they finish, to
+                    # measure throughput per page class
+                    page_class = classify_document(pdf)[0]
+                    samples.append((engine.lower(), page_class, seconds))
+            except Exception as e:
+                click.echo(f"ERROR: {e}", err=True)
+                d["failed"] = True
+            d["remaining"] -= 1
+            if d["remaining"]:
+                continue
+
+            if d["failed"]:
+                click.echo(
+                    f"[ERROR] {d['input']} failed, workspace kept for re-run: "
+                    f"{d['workspace']}",
+                    err=True,
                 )
-            combined = f"{base}_pdfmd.md"
-            with open(combined, "w", encoding="utf-8") as fout:
-                for md in md_files:
-                    click.echo(f"[INFO] Adding {md} to {combined}")
-                    with open(md, "r", encoding="utf-8") as fin:
-                        fcontent = fin.read()
-
-                        # Trim some unnecessarey text
-                        # Remove ":unselected:" and ":selected:"
-                        fcontent = re.sub(r":unselected:|:selected:", "", fcontent)
-
-                        fout.write(fcontent)
-                        fout.write("\n\n")
-            click.echo(f"[INFO] Combined Markdown saved as {combined}")
-        else:
-            click.echo("[ABORT] Phase 3 cancelled.")
+                failed.append(d["input"])
+                continue
+
+            # Phase 3: combine Markdown files
+            click.echo(f"[INFO] Phase 3: combining Markdown files for {d['input']}...")
+            finish_document(d, rules)
+
+    record_throughput(samples)
+
+    if profile:
+        report_path, folded_path = merge_profiles(profile_path)
+        click.echo(f"[INFO] Profile report saved as {report_path}")
+        click.echo(f"[INFO] Collapsed stacks for flamegraph saved as {folded_path}")
+
+    # remove the workspace root once every document has been cleaned up
+    try:
+        os.rmdir(WORK_DIR)
+    except OSError:
+        pass
 
+    if failed:
+        click.echo(f"[ERROR] {len(failed)} document(s) failed: {', '.join(failed)}")
+        sys.exit(1)
     print("[INFO] All done!")
 
 
@@ -1,5 +1,5 @@
 """
-Redact a user‑selected area in page 1 of a PDF and export the selection as PNG.
+Redact a user‑selected area in page 1 of a PDF and export the selection as PNG/WebP.
 """
 
 import sys
@@ -11,6 +11,7 @@ import tkinter as tk
 from PIL import Image, ImageTk
 from dotenv import load_dotenv
 import shutil  # for copying original PDF when no crop
+from utils.image_utils import IMAGE_FORMATS, start_encoding, finish_encoding
 
 # ensure the Windows console uses UTF-8 so Unicode symbols like ✓ and Japanese text can print
 if sys.platform.startswith("win"):
@@ -21,7 +22,12 @@ load_dotenv()
 
 
 def select_and_redact(
-    pdf_path: str, out_pdf: str, page_index: int = 1, zoom: float = 2.0
+    pdf_path: str,
+    out_pdf: str,
+    page_index: int = 1,
+    zoom: float = 2.0,
+    image_format: str = "png",
+    max_dim: int = 0,
 ) -> None:
     # derive base name for PNG outputs
     base_name = os.path.splitext(os.path.basename(pdf_path))[0]
@@ -113,14 +119,14 @@ def select_and_redact(
         print(f"✓  Exported original PDF to {out_pdf}")
         return []
 
-    # Save crops (unless skipped) and collect rects for redaction
+    # Encode crops (unless skipped) on a background thread pool while the
+    # redacted PDF is being written
+    jobs = []
     for idx, (x0, y0, x1, y1, skip_png, _rect_id) in enumerate(selections, start=1):
         if not skip_png:
             cropped = img.crop((x0, y0, x1, y1))
-            img_path = f"{base_name}_pdfcrop_{page_index}_{idx}.png"
-            cropped.save(img_path, "PNG")
-            print(f"✓  Cropped image exported to {img_path}")
-            img_paths.append(img_path)
+            jobs.append((cropped, f"{base_name}_pdfcrop_{page_index}_{idx}"))
+    executor, futures = start_encoding(jobs, image_format, max_dim)
 
     # Create a new PDF with only the selected page and apply true redactions
     new_doc = fitz.open()
@@ -136,6 +142,17 @@ def select_and_redact(
     new_doc.close()
     doc.close()  # Close the original document
     print(f"✓  Redacted page saved to {out_pdf}")
+
+    # Wait for the encoded images and record their sizes in a manifest
+    manifest_path = f"{base_name}_pdfcrop_{page_index}_manifest.json" if jobs else None
+    for entry in finish_encoding(executor, futures, manifest_path):
+        print(
+            f"✓  Cropped image exported to {entry['file']} "
+            f"({entry['width']}x{entry['height']}, {entry['bytes']} bytes)"
+        )
+        img_paths.append(entry["file"])
+    if manifest_path:
+        print(f"✓  Image manifest saved to {manifest_path}")
     return img_paths
 
 
@@ -162,11 +179,21 @@ def main_cli():
         zoom = float(os.getenv("PDFCROP_ZOOM_LEVEL", "2"))
     except ValueError:
         zoom = 2.0
+    # read image output format and downscale limit from environment
+    image_format = os.getenv("PDFCROP_IMAGE_FORMAT", "png").lower()
+    if image_format not in IMAGE_FORMATS:
+        parser.error(f"PDFCROP_IMAGE_FORMAT must be one of: {', '.join(IMAGE_FORMATS)}")
+    try:
+        max_dim = int(os.getenv("PDFCROP_MAX_DIMENSION", "0"))
+    except ValueError:
+        max_dim = 0
     select_and_redact(
         args.input_pdf,
         output_pdf,
         args.page,
         zoom,
+        image_format,
+        max_dim,
     )
 
 
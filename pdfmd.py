@@ -1,8 +1,8 @@
 #!/usr/bin/env python
 import os
 import click
-from utils.azure_ai_utils import azure_ai_pdfmd
-from utils.pdfplumber_utils import pdfplumber_pdfmd
+from utils.engines import engine_names, get_engine, validate_engine
+from utils.profile_utils import profile_stage
 
 
 @click.command()
@@ -17,11 +17,20 @@ from utils.pdfplumber_utils import pdfplumber_pdfmd
     "-e",
     "--engine",
     "engine",
-    type=click.Choice(["azureai", "pdfplumber"], case_sensitive=False),
     default="azureai",
-    help="Extraction engine: azureai (default) or pdfplumber",
+    callback=validate_engine,
+    help="Extraction engine: "
+    + ", ".join(engine_names())
+    + " or a plugin engine (default azureai)",
 )
-def main(input_path, engine):
+@click.option(
+    "--engine-target",
+    "engine_target",
+    hidden=True,
+    is_eager=True,
+    help="module:function of the engine, passed by main.py so plugins are not scanned again",
+)
+def main(input_path, engine, engine_target):
     click.echo("[INFO] Starting PDF to Markdown conversion...")
 
     # derive output markdown path
@@ -29,14 +38,11 @@ def main(input_path, engine):
     output_path = f"{base}_pdfmd.md"
 
     try:
-        # choose extraction engine
-        if engine.lower() == "azureai":
-            click.echo("[INFO] Using Azure AI for extraction...")
-            result_path = azure_ai_pdfmd(input_path, output_path)
-
-        if engine.lower() == "pdfplumber":
-            click.echo("[INFO] Using pdfplumber for extraction...")
-            result_path = pdfplumber_pdfmd(input_path, output_path)
+        # choose extraction engine (imported only now that it is selected)
+        click.echo(f"[INFO] Using {engine.lower()} for extraction...")
+        with profile_stage(f"extract_{engine.lower()}"):
+            extract = get_engine(engine)
+            result_path = extract(input_path, output_path)
 
     except Exception as e:
         click.echo(f"[ERROR] {e}")
@@ -3,6 +3,7 @@ import os
 import glob
 import fitz  # PyMuPDF
 import click
+from utils.profile_utils import profile_stage
 
 
 @click.command()
@@ -16,15 +17,16 @@ def main(input_pdf):
         os.remove(old)
         click.echo(f"[INFO] Removed old split file: {old}")
 
-    doc = fitz.open(input_pdf)
-    for idx in range(len(doc)):
-        single = fitz.open()
-        single.insert_pdf(doc, from_page=idx, to_page=idx)
-        out_name = f"{base}_pdfsplit_{idx+1}.pdf"
-        single.save(out_name)
-        single.close()
-        click.echo(f"[INFO] Exported page {idx+1} to {out_name}")
-    doc.close()
+    with profile_stage("split"):
+        doc = fitz.open(input_pdf)
+        for idx in range(len(doc)):
+            single = fitz.open()
+            single.insert_pdf(doc, from_page=idx, to_page=idx)
+            out_name = f"{base}_pdfsplit_{idx+1}.pdf"
+            single.save(out_name)
+            single.close()
+            click.echo(f"[INFO] Exported page {idx+1} to {out_name}")
+        doc.close()
 
 
 if __name__ == "__main__":
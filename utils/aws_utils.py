@@ -1,16 +1,68 @@
 import os
+import re
+import hashlib
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
 import requests
 import click
 import sys  # exit on errors
 
+# Files above the threshold are uploaded as parallel multipart uploads
+MULTIPART_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=8,
+)
+
+
+def content_key(input_path: str) -> str:
+    """Return an S3 object key derived from the SHA-256 of the file content."""
+    digest = hashlib.sha256()
+    with open(input_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    ext = os.path.splitext(input_path)[1].lower()
+    return f"{digest.hexdigest()}{ext}"
+
+
+def _needs_upload(s3, bucket: str, key: str, expiration: int) -> bool:
+    """
+    Return True unless the object already exists and will outlive the presigned URL.
+    A failed HEAD (404, or 403 when s3:ListBucket is not granted) means upload.
+    A bucket lifecycle rule reports the object's expiry date in the Expiration
+    header; if it expires before the URL, uploading again restarts its lifetime.
+    """
+    try:
+        head = s3.head_object(Bucket=bucket, Key=key)
+    except ClientError as e:
+        # without s3:ListBucket S3 answers 403 instead of 404 for a missing key,
+        # so any HEAD failure just means the object has to be uploaded
+        click.echo(f"[INFO] No usable object {key} in S3 ({e}), uploading...")
+        return True
+    match = re.search(r'expiry-date="([^"]+)"', head.get("Expiration", ""))
+    if match:
+        expires_at = parsedate_to_datetime(match.group(1))
+        if expires_at <= datetime.now(timezone.utc) + timedelta(seconds=expiration):
+            click.echo(f"[INFO] Object {key} expires at {expires_at}, re-uploading...")
+            return True
+    return False
+
 
 def s3_upload(input_path: str, bucket: str, expiration: int = 3600) -> str:
-    """Upload a file to S3, generate presigned URL, verify accessibility, and return URL."""
-    click.echo(f"[INFO] Uploading {input_path} to S3 bucket {bucket}...")
+    """
+    Upload a file to S3 under a content-addressed key (skipped if already there),
+    generate presigned URL, verify accessibility, and return URL.
+    """
     s3 = boto3.client("s3")
-    key = os.path.basename(input_path)
-    s3.upload_file(input_path, bucket, key)
+    key = content_key(input_path)
+    if _needs_upload(s3, bucket, key, expiration):
+        click.echo(f"[INFO] Uploading {input_path} to S3 bucket {bucket} as {key}...")
+        s3.upload_file(input_path, bucket, key, Config=MULTIPART_CONFIG)
+    else:
+        click.echo(f"[INFO] {input_path} already in S3 bucket {bucket} as {key}.")
     file_url = s3.generate_presigned_url(
         "get_object", Params={"Bucket": bucket, "Key": key}, ExpiresIn=expiration
     )
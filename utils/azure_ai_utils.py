@@ -9,6 +9,8 @@ from rich.progress import (
     TimeElapsedColumn,
 )
 from utils.aws_utils import s3_upload
+from utils.boilerplate_utils import write_layout
+from utils.profile_utils import profile_stage
 
 
 # Load env variables
@@ -86,58 +88,76 @@ def azure_ai_pdfmd(pdf_path: str, output_path: str) -> str:
                 return output_path
             time.sleep(1)
 
-    # Process results into markdown
-    print("[INFO] Parsing analysis result...")
-    analyze_result = result.get("analyzeResult", {})
-    md = []
-    raw_paragraphs = analyze_result.get("paragraphs", [])
-    raw_tables = analyze_result.get("tables", [])
-
-    # identify paragraphs included in tables
-    table_para_idxs = set()
-    for t in raw_tables:
-        for cell in t.get("cells", []):
-            for elem in cell.get("elements", []):
-                if elem.startswith("/paragraphs/"):
-                    table_para_idxs.add(int(elem.split("/")[-1]))
-
-    # build items list
-    items = []
-    for idx, p in enumerate(raw_paragraphs):
-        if idx in table_para_idxs:
-            continue
-        br = p.get("boundingRegions", [{}])[0]
-        pg = br.get("pageNumber", 0)
-        poly = br.get("polygon", [0, 0])
-        items.append((pg, poly[1], poly[0], "para", p))
-    for t in raw_tables:
-        br = t.get("boundingRegions", [{}])[0]
-        pg = br.get("pageNumber", 0)
-        poly = br.get("polygon", [0, 0])
-        items.append((pg, poly[1], poly[0], "table", t))
-    items.sort(key=lambda x: (x[0], x[1], x[2]))
-
-    for _, _, _, kind, obj in items:
-        if kind == "para":
-            text = obj.get("content", "").strip()
-            if text:
-                md.append(text)
+    # Process results into markdown (profiled as its own stage with --profile)
+    with profile_stage("azure_parse"):
+        print("[INFO] Parsing analysis result...")
+        analyze_result = result.get("analyzeResult", {})
+        md = []
+        raw_paragraphs = analyze_result.get("paragraphs", [])
+        raw_tables = analyze_result.get("tables", [])
+        page_heights = {
+            p.get("pageNumber"): p.get("height")
+            for p in analyze_result.get("pages", [])
+        }
+
+        # identify paragraphs included in tables
+        table_para_idxs = set()
+        for t in raw_tables:
+            for cell in t.get("cells", []):
+                for elem in cell.get("elements", []):
+                    if elem.startswith("/paragraphs/"):
+                        table_para_idxs.add(int(elem.split("/")[-1]))
+
+        # build items list, keeping paragraph positions for header/footer detection
+        items = []
+        layout = []
+        for idx, p in enumerate(raw_paragraphs):
+            if idx in table_para_idxs:
+                continue
+            br = p.get("boundingRegions", [{}])[0]
+            pg = br.get("pageNumber", 0)
+            poly = br.get("polygon", [0, 0])
+            items.append((pg, poly[1], poly[0], "para", p))
+            height = page_heights.get(pg)
+            if height:
+                layout.append(
+                    {
+                        "page": pg,
+                        "text": p.get("content", "").strip(),
+                        "top": min(poly[1::2]) / height,
+                        "bottom": max(poly[1::2]) / height,
+                        "role": p.get("role"),
+                    }
+                )
+        for t in raw_tables:
+            br = t.get("boundingRegions", [{}])[0]
+            pg = br.get("pageNumber", 0)
+            poly = br.get("polygon", [0, 0])
+            items.append((pg, poly[1], poly[0], "table", t))
+        items.sort(key=lambda x: (x[0], x[1], x[2]))
+
+        for _, _, _, kind, obj in items:
+            if kind == "para":
+                text = obj.get("content", "").strip()
+                if text:
+                    md.append(text)
+                    md.append("")
+            else:
+                rows = obj.get("rowCount", 0)
+                cols = obj.get("columnCount", 0)
+                grid = [["" for _ in range(cols)] for _ in range(rows)]
+                for cell in obj.get("cells", []):
+                    r, c = cell.get("rowIndex"), cell.get("columnIndex")
+                    content = cell.get("content", "").replace("\n", " ").strip()
+                    grid[r][c] = content
+                md.append("| " + " | ".join(grid[0]) + " |")
+                md.append("| " + " | ".join(["---"] * cols) + " |")
+                for row in grid[1:]:
+                    md.append("| " + " | ".join(row) + " |")
                 md.append("")
-        else:
-            rows = obj.get("rowCount", 0)
-            cols = obj.get("columnCount", 0)
-            grid = [["" for _ in range(cols)] for _ in range(rows)]
-            for cell in obj.get("cells", []):
-                r, c = cell.get("rowIndex"), cell.get("columnIndex")
-                content = cell.get("content", "").replace("\n", " ").strip()
-                grid[r][c] = content
-            md.append("| " + " | ".join(grid[0]) + " |")
-            md.append("| " + " | ".join(["---"] * cols) + " |")
-            for row in grid[1:]:
-                md.append("| " + " | ".join(row) + " |")
-            md.append("")
 
     # Write markdown file
     with open(output_path, "w", encoding="utf-8") as f:
         f.write("\n".join(md))
+    write_layout(output_path, layout)
     return output_path
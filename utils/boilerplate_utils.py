@@ -0,0 +1,177 @@
+import os
+import re
+import json
+from collections import Counter
+
+# Default rules for stripping running headers/footers in the combine stage.
+# Override any of them with a JSON file passed to main.py --strip-rules.
+DEFAULT_RULES = {
+    # fraction of the page height treated as header / footer area
+    "header_band": 0.1,
+    "footer_band": 0.1,
+    # an edge line must repeat on at least this many pages to be stripped
+    "min_pages": 3,
+    # repeats are matched on the exact (whitespace-normalized) text; set to
+    # true to also treat lines differing only in numbers as repeats
+    "fold_digits": False,
+    # edge lines matching these are dropped on every page (page numbers);
+    # matched against the digit-folded line: lower case, digit runs as "#"
+    "drop_line_patterns": [
+        r"^\s*(page\s*)?#(\s*(of|/)\s*#)?\s*$",
+        r"^\s*-\s*#\s*-\s*$",
+    ],
+    # removed from every line, anywhere in the page
+    "remove_patterns": [r":unselected:|:selected:"],
+}
+
+# Azure Document Intelligence paragraph roles for page furniture
+_ROLE_BANDS = {"pageHeader": "header", "pageFooter": "footer"}
+
+
+def layout_path_for(md_path: str) -> str:
+    """Return the position sidecar path written next to a page markdown file."""
+    return os.path.splitext(md_path)[0] + ".json"
+
+
+def write_layout(md_path: str, blocks: list) -> str:
+    """
+    Write paragraph position data for a page markdown file.
+    Each block is a dict with text, top and bottom (fractions of page height)
+    and an optional role.
+    """
+    path = layout_path_for(md_path)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(blocks, f, ensure_ascii=False)
+    return path
+
+
+def load_rules(path: str = None) -> dict:
+    """Return DEFAULT_RULES updated with the JSON rules file at path, if given."""
+    rules = dict(DEFAULT_RULES)
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            overrides = json.load(f)
+        unknown = set(overrides) - set(DEFAULT_RULES)
+        if unknown:
+            raise ValueError(f"Unknown strip rule(s): {', '.join(sorted(unknown))}")
+        rules.update(overrides)
+    return rules
+
+
+def _normalize(line: str) -> str:
+    # collapse whitespace only, so repeats must have the same text
+    return re.sub(r"\s+", " ", line.strip())
+
+
+def _fold_digits(norm: str) -> str:
+    # lower case and fold digit runs so "Page 3 of 10" matches "Page 4 of 10"
+    return re.sub(r"\d+", "#", norm.lower())
+
+
+def _edge_key(line: str, rules: dict) -> str:
+    norm = _normalize(line)
+    return _fold_digits(norm) if rules["fold_digits"] else norm
+
+
+def _edge_lines(layout_path: str, rules: dict) -> dict:
+    """
+    Return {"header": Counter, "footer": Counter} of the normalized lines that
+    sit in the header/footer band of one page, one count per occurrence.
+    """
+    edges = {"header": Counter(), "footer": Counter()}
+    if not os.path.isfile(layout_path):
+        return edges
+    with open(layout_path, "r", encoding="utf-8") as f:
+        blocks = json.load(f)
+    for b in blocks:
+        band = _ROLE_BANDS.get(b.get("role"))
+        if band is None:
+            if b.get("top", 1) <= rules["header_band"]:
+                band = "header"
+            elif b.get("bottom", 0) >= 1 - rules["footer_band"]:
+                band = "footer"
+            elif b.get("role") == "pageNumber":
+                band = "footer"
+            else:
+                continue
+        for line in b.get("text", "").splitlines():
+            key = _edge_key(line, rules)
+            if key:
+                edges[band][key] += 1
+    return edges
+
+
+def scan_layouts(md_paths: list, rules: dict) -> tuple:
+    """
+    Read the position sidecars of all pages once, before the markdown is streamed.
+    Returns (per-page edge line Counters, Counter of pages each edge line appears on).
+    """
+    page_edges = [_edge_lines(layout_path_for(md), rules) for md in md_paths]
+    counts = Counter()
+    for edges in page_edges:
+        counts.update((norm, band) for band in edges for norm in edges[band])
+    return page_edges, counts
+
+
+def compile_rules(rules: dict) -> tuple:
+    """Compile the rule patterns once per combine: (drop line regexes, remove regex)."""
+    drop_res = [re.compile(p, re.IGNORECASE) for p in rules["drop_line_patterns"]]
+    remove_re = (
+        re.compile("|".join(rules["remove_patterns"]))
+        if rules["remove_patterns"]
+        else None
+    )
+    return drop_res, remove_re
+
+
+def _mark_edges(norms: list, order, band_counts: Counter, band: str, marks: dict):
+    # walk non-blank lines from one end of the page, marking those that match
+    # the band's remaining occurrences; the first non-matching line stops it
+    left = Counter(band_counts)
+    for i in order:
+        if not norms[i]:
+            continue
+        if i in marks or left[norms[i]] <= 0:
+            break
+        left[norms[i]] -= 1
+        marks[i] = band
+
+
+def strip_boilerplate(
+    lines, edges: dict, counts: Counter, seen: set, rules: dict, patterns: tuple
+):
+    """
+    Yield the lines of one page with repeated headers/footers removed.
+    Only the page's leading/trailing lines matching the header/footer band
+    occurrences of its layout are candidates, so body text is never stripped.
+    The first copy of each repeated edge line is kept; seen is shared across
+    pages so later copies are dropped. Consecutive blank lines left behind
+    are collapsed, and leading blank lines of the page are dropped.
+    patterns is the result of compile_rules(rules).
+    """
+    drop_res, remove_re = patterns
+    lines = list(lines)
+    norms = [_edge_key(line, rules) for line in lines]
+    marks = {}
+    _mark_edges(norms, range(len(lines)), edges["header"], "header", marks)
+    _mark_edges(norms, range(len(lines) - 1, -1, -1), edges["footer"], "footer", marks)
+
+    prev_blank = True
+    for i, line in enumerate(lines):
+        band = marks.get(i)
+        if band is not None:
+            norm = norms[i]
+            if any(r.match(_fold_digits(norm)) for r in drop_res):
+                continue
+            key = (norm, band)
+            if counts[key] >= rules["min_pages"]:
+                if key in seen:
+                    continue
+                seen.add(key)
+        if remove_re is not None:
+            line = remove_re.sub("", line)
+        blank = not line.strip()
+        if blank and prev_blank:
+            continue
+        prev_blank = blank
+        yield line
@@ -0,0 +1,116 @@
+import os
+import importlib
+import click
+
+# Extra engines, as "name=module:function,..." (environment or .env)
+ENGINES_ENV = "PDFMD_ENGINES"
+# Installed packages can also expose engines in this entry point group
+ENTRY_POINT_GROUP = "pdfmd.engines"
+
+# Extraction engine registry: name -> "module:function" or a callable.
+# Engines registered as strings are imported only when they are selected, so
+# the CLI does not pay for boto3/requests/pdfplumber unless they are used.
+_ENGINES = {}
+_plugins_loaded = False
+
+
+def register_engine(name: str, target) -> None:
+    """
+    Register an extraction engine under name.
+    target is either a "module:function" string (imported lazily) or a callable
+    taking (input_path, output_path) and returning the markdown file path.
+    """
+    _ENGINES[name.lower()] = target
+
+
+def engine_names() -> list:
+    """Return the names of all registered engines, in registration order."""
+    return list(_ENGINES)
+
+
+def load_plugin_engines() -> None:
+    """
+    Register engines from the pdfmd.engines entry point group and the
+    PDFMD_ENGINES variable, once. Only called when a selected engine is not
+    built in, so the common path never scans entry points or reads .env.
+    Invalid PDFMD_ENGINES entries are skipped with a warning.
+    """
+    global _plugins_loaded
+    if _plugins_loaded:
+        return
+    _plugins_loaded = True
+
+    from importlib.metadata import entry_points
+
+    for ep in entry_points(group=ENTRY_POINT_GROUP):
+        _ENGINES.setdefault(ep.name.lower(), ep.value)
+
+    try:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+    except ImportError:
+        pass
+    for spec in os.getenv(ENGINES_ENV, "").split(","):
+        if not spec.strip():
+            continue
+        name, sep, target = spec.partition("=")
+        if not sep or ":" not in target or not name.strip():
+            click.echo(
+                f"[WARN] Ignoring invalid {ENGINES_ENV} entry: {spec.strip()} "
+                "(expected name=module:function)",
+                err=True,
+            )
+            continue
+        _ENGINES.setdefault(name.strip().lower(), target.strip())
+
+
+def engine_target(name: str) -> str:
+    """
+    Return the "module:function" of engine name, looking at plugin engines
+    if it is not built in. Raises ValueError for unknown engines.
+    """
+    key = name.lower()
+    if key not in _ENGINES:
+        load_plugin_engines()
+    if key not in _ENGINES:
+        raise ValueError(
+            f"Unknown engine: {name} (available: {', '.join(engine_names())})"
+        )
+    target = _ENGINES[key]
+    if not isinstance(target, str):
+        target = f"{target.__module__}:{target.__qualname__}"
+    return target
+
+
+def validate_engine(ctx, param, value):
+    """
+    click callback for -e: accept built-in and plugin engine names.
+    An --engine-target given by the parent process registers the engine
+    directly, so child processes never scan for plugins.
+    """
+    target = ctx.params.get("engine_target")
+    if target:
+        register_engine(value, target)
+        return value.lower()
+    try:
+        engine_target(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+    return value.lower()
+
+
+def get_engine(name: str):
+    """Return the extraction function for name, importing its module on first use."""
+    key = name.lower()
+    engine_target(key)
+    target = _ENGINES[key]
+    if isinstance(target, str):
+        module_name, func_name = target.split(":", 1)
+        target = getattr(importlib.import_module(module_name), func_name)
+        _ENGINES[key] = target
+    return target
+
+
+register_engine("azureai", "utils.azure_ai_utils:azure_ai_pdfmd")
+register_engine("pdfplumber", "utils.pdfplumber_utils:pdfplumber_pdfmd")
@@ -0,0 +1,70 @@
+import os
+import json
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+
+# Output formats for cropped images: name -> file extension
+IMAGE_FORMATS = {
+    "png": ".png",  # lossless, optimized deflate
+    "webp": ".webp",  # lossy, smallest for photos and scans
+    "palette": ".png",  # quantized to 256 colors, small for charts and diagrams
+}
+WEBP_QUALITY = 80
+
+
+def encode_image(img: Image.Image, path_base: str, fmt: str, max_dim: int = 0) -> dict:
+    """
+    Downscale img to fit max_dim (0 keeps the size), save it as path_base + extension
+    in the given format, and return its manifest entry.
+    """
+    source_width, source_height = img.size
+    if max_dim and max(img.size) > max_dim:
+        img = img.copy()
+        img.thumbnail((max_dim, max_dim), Image.LANCZOS)
+
+    path = path_base + IMAGE_FORMATS[fmt]
+    if fmt == "webp":
+        img.save(path, "WEBP", quality=WEBP_QUALITY, method=6)
+    elif fmt == "palette":
+        img.quantize(colors=256).save(path, "PNG", optimize=True)
+    else:
+        img.save(path, "PNG", optimize=True)
+
+    return {
+        "file": os.path.basename(path),
+        "format": fmt,
+        "width": img.width,
+        "height": img.height,
+        "source_width": source_width,
+        "source_height": source_height,
+        "bytes": os.path.getsize(path),
+    }
+
+
+def start_encoding(jobs: list, fmt: str, max_dim: int = 0, workers: int = None):
+    """
+    Encode (img, path_base) jobs on a background thread pool.
+    Returns (executor, futures); call finish_encoding to wait for the results.
+    """
+    if fmt not in IMAGE_FORMATS:
+        raise ValueError(
+            f"Unknown image format: {fmt} (available: {', '.join(IMAGE_FORMATS)})"
+        )
+    executor = ThreadPoolExecutor(max_workers=workers)
+    futures = [
+        executor.submit(encode_image, img, path_base, fmt, max_dim)
+        for img, path_base in jobs
+    ]
+    return executor, futures
+
+
+def finish_encoding(executor, futures: list, manifest_path: str = None) -> list:
+    """Wait for the encoded images, write the JSON manifest and return its entries."""
+    try:
+        entries = [f.result() for f in futures]
+    finally:
+        executor.shutdown()
+    if manifest_path:
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f, ensure_ascii=False, indent=2)
+    return entries
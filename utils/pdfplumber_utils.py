@@ -1,4 +1,5 @@
 import pdfplumber
+from utils.boilerplate_utils import write_layout
 
 
 def pdfplumber_pdfmd(input_path: str, output_path: str) -> str:
@@ -8,6 +9,7 @@ def pdfplumber_pdfmd(input_path: str, output_path: str) -> str:
     """
     # collect items with position info
     items = []
+    layout = []  # paragraph positions for header/footer detection
     with pdfplumber.open(input_path) as pdf:
         for page_num, page in enumerate(pdf.pages, start=1):
             # only process first page
@@ -57,6 +59,15 @@ def pdfplumber_pdfmd(input_path: str, output_path: str) -> str:
             for line in lines:
                 content = " ".join(w["text"] for w in line)
                 y0 = line[0].get("top", 0)
+                y1 = max(w.get("bottom", y0) for w in line)
+                layout.append(
+                    {
+                        "page": page_num,
+                        "text": content,
+                        "top": y0 / page.height,
+                        "bottom": y1 / page.height,
+                    }
+                )
 
                 # debug print paragraph(position) info
                 print(f"[DEBUG] Paragraph: {content}")
@@ -89,4 +100,5 @@ def pdfplumber_pdfmd(input_path: str, output_path: str) -> str:
                     f.write("| " + " | ".join(cells) + " |\n")
                 f.write("\n")
 
+    write_layout(output_path, layout)
     return output_path
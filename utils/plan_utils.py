@@ -0,0 +1,135 @@
+import os
+import json
+import fitz
+
+# Seconds per page measured by main.py on this machine, per engine and page class
+THROUGHPUT_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    ".pdfmd_throughput.json",
+)
+# Used until a page class has been measured for an engine
+DEFAULT_SECONDS_PER_PAGE = {
+    "azureai": {"text": 8.0, "table": 12.0, "scanned": 10.0},
+    "pdfplumber": {"text": 0.5, "table": 1.5, "scanned": 0.3},
+}
+DEFAULT_ENGINE_SECONDS = 5.0  # engines without defaults or measurements
+# Azure Document Intelligence prebuilt-layout price, USD per 1000 pages,
+# overridden by AZURE_PRICE_PER_1000_PAGES (environment or .env)
+DEFAULT_AZURE_PRICE_PER_1000_PAGES = 10.0
+
+PAGE_CLASSES = ("text", "table", "scanned")
+MIN_TEXT_CHARS = 20  # less extractable text than this means a scanned page
+TABLE_RULINGS = 20  # at least this many ruling lines/rectangles means a table page
+
+
+def classify_page(page) -> str:
+    """Classify a PyMuPDF page as text, table (ruling-dense) or scanned (no text layer)."""
+    if len(page.get_text("text").strip()) < MIN_TEXT_CHARS:
+        return "scanned"
+    rulings = 0
+    for drawing in page.get_drawings():
+        rulings += sum(1 for item in drawing["items"] if item[0] in ("l", "re"))
+        if rulings >= TABLE_RULINGS:
+            return "table"
+    return "text"
+
+
+def classify_document(pdf_path: str) -> list:
+    """Return the class of every page of a PDF, without touching any network service."""
+    doc = fitz.open(pdf_path)
+    try:
+        return [classify_page(page) for page in doc]
+    finally:
+        doc.close()
+
+
+def load_throughput() -> dict:
+    """Return measured {engine: {class: {"pages": n, "seconds": total}}}."""
+    if not os.path.isfile(THROUGHPUT_FILE):
+        return {}
+    with open(THROUGHPUT_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def record_throughput(samples: list) -> None:
+    """Add (engine, page class, seconds) samples to the measured throughput file."""
+    if not samples:
+        return
+    measured = load_throughput()
+    for engine, page_class, seconds in samples:
+        stats = measured.setdefault(engine, {}).setdefault(
+            page_class, {"pages": 0, "seconds": 0.0}
+        )
+        stats["pages"] += 1
+        stats["seconds"] += seconds
+    with open(THROUGHPUT_FILE, "w", encoding="utf-8") as f:
+        json.dump(measured, f, indent=2)
+
+
+def seconds_per_page(engine: str, page_class: str, measured: dict) -> tuple:
+    """Return (seconds per page, source) where source is "measured" or "default"."""
+    stats = measured.get(engine, {}).get(page_class)
+    if stats and stats["pages"]:
+        return stats["seconds"] / stats["pages"], "measured"
+    defaults = DEFAULT_SECONDS_PER_PAGE.get(engine, {})
+    return defaults.get(page_class, DEFAULT_ENGINE_SECONDS), "default"
+
+
+def azure_price_per_1000_pages() -> float:
+    """Return the Azure price per 1000 pages from the environment or .env."""
+    try:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+    except ImportError:
+        pass
+    value = os.getenv("AZURE_PRICE_PER_1000_PAGES")
+    if not value:
+        return DEFAULT_AZURE_PRICE_PER_1000_PAGES
+    try:
+        price = float(value)
+    except ValueError:
+        price = -1.0
+    if price < 0:
+        raise ValueError(
+            f"AZURE_PRICE_PER_1000_PAGES must be a non-negative number, got: {value}"
+        )
+    return price
+
+
+def estimate(doc_classes: list, engine: str, workers: int) -> dict:
+    """
+    Estimate a batch from the page classes of each document.
+    Wall-clock time assumes pages are spread evenly over the workers, but a run
+    can never be shorter than its slowest page.
+    """
+    price = azure_price_per_1000_pages()
+    measured = load_throughput()
+    counts = {c: 0 for c in PAGE_CLASSES}
+    for classes in doc_classes:
+        for c in classes:
+            counts[c] += 1
+
+    total_seconds = 0.0
+    longest = 0.0
+    sources = {}
+    for c, n in counts.items():
+        seconds, sources[c] = seconds_per_page(engine, c, measured)
+        total_seconds += seconds * n
+        if n:
+            longest = max(longest, seconds)
+
+    pages = sum(counts.values())
+    azure_pages = pages if engine == "azureai" else 0
+    return {
+        "documents": len(doc_classes),
+        "pages": pages,
+        "classes": counts,
+        "sources": sources,
+        "azure_transactions": azure_pages,
+        # content-addressed uploads skip pages already in the bucket
+        "s3_uploads_max": azure_pages,
+        "cost_usd": azure_pages * price / 1000,
+        "serial_seconds": total_seconds,
+        "wall_seconds": max(total_seconds / workers, longest),
+    }
@@ -0,0 +1,159 @@
+import os
+import sys
+import json
+import glob
+import time
+import threading
+from contextlib import contextmanager
+from collections import Counter
+
+# main.py --profile sets this; child scripts inherit it and write their
+# stage profiles into the same run directory
+PROFILE_DIR_ENV = "PDFMD_PROFILE_DIR"
+SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+TOP_FUNCTIONS = 40
+
+_local = threading.local()
+_seq = Counter()
+_seq_lock = threading.Lock()
+
+
+def profile_dir():
+    """Return the profile directory of the current run, or None when not profiling."""
+    return os.getenv(PROFILE_DIR_ENV) or None
+
+
+def _frame_label(code) -> str:
+    return (
+        f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    )
+
+
+def _sample(thread_id: int, root, stages: list, counts: Counter, stop) -> None:
+    """
+    Sample the stack of thread_id until stop is set, counting collapsed stacks.
+    Frames above root (the frame that opened the stage) are left out, and so are
+    samples taken while this module runs (entering or leaving a stage).
+    """
+    while not stop.wait(SAMPLE_INTERVAL):
+        frame = sys._current_frames().get(thread_id)
+        frames = []
+        while frame is not None:
+            if frame.f_code.co_filename == __file__:
+                frames = None
+                break
+            frames.append(_frame_label(frame.f_code))
+            if frame is root:
+                break
+            frame = frame.f_back
+        if frames:
+            counts[";".join(stages + frames[::-1])] += 1
+
+
+@contextmanager
+def profile_stage(name: str):
+    """
+    Profile the enclosed block as stage name when the run is profiled.
+    Writes a cProfile dump and collapsed stacks per stage and process; a stage
+    opened inside another one on the same thread is only timed and shows up
+    under its parent in the collapsed stacks.
+    """
+    out_dir = profile_dir()
+    if not out_dir:
+        yield
+        return
+
+    with _seq_lock:
+        _seq[name] += 1
+        path_base = os.path.join(out_dir, f"{name}_{os.getpid()}_{_seq[name]}")
+    stages = getattr(_local, "stages", None)
+    start = time.perf_counter()
+    if stages:
+        # nested stage: the outer stage's profiler and sampler already run
+        stages.append(name)
+        try:
+            yield
+        finally:
+            stages.pop()
+            _write_timing(path_base, name, time.perf_counter() - start)
+        return
+
+    import cProfile
+
+    _local.stages = stages = [name]
+    # 0: this generator, 1: contextlib __enter__, 2: the block being profiled
+    root = sys._getframe(2)
+    counts = Counter()
+    stop = threading.Event()
+    sampler = threading.Thread(
+        target=_sample,
+        args=(threading.get_ident(), root, stages, counts, stop),
+        daemon=True,
+    )
+    profiler = cProfile.Profile()
+    sampler.start()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        stop.set()
+        profiler.disable()
+        sampler.join()
+        _local.stages = None
+        profiler.dump_stats(path_base + ".prof")
+        with open(path_base + ".folded", "w", encoding="utf-8") as f:
+            for stack, count in counts.items():
+                f.write(f"{stack} {count}\n")
+        _write_timing(path_base, name, time.perf_counter() - start)
+
+
+def _write_timing(path_base: str, name: str, seconds: float) -> None:
+    with open(path_base + ".json", "w", encoding="utf-8") as f:
+        json.dump({"stage": name, "seconds": seconds}, f)
+
+
+def merge_profiles(out_dir: str) -> tuple:
+    """
+    Merge all stage profiles of a run into one report.
+    Writes profile_report.txt (stage times and top functions by cumulative time),
+    profile_merged.prof (for pstats/snakeviz) and profile.folded (collapsed
+    stacks for flamegraph tools). Returns (report path, folded path).
+    """
+    import pstats
+
+    report_path = os.path.join(out_dir, "profile_report.txt")
+    folded_path = os.path.join(out_dir, "profile.folded")
+
+    stage_times = {}
+    for path in glob.glob(os.path.join(out_dir, "*_*_*.json")):
+        with open(path, "r", encoding="utf-8") as f:
+            timing = json.load(f)
+        count, total = stage_times.get(timing["stage"], (0, 0.0))
+        stage_times[timing["stage"]] = (count + 1, total + timing["seconds"])
+
+    stacks = Counter()
+    for path in glob.glob(os.path.join(out_dir, "*_*_*.folded")):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                stack, _, count = line.rstrip("\n").rpartition(" ")
+                stacks[stack] += int(count)
+    with open(folded_path, "w", encoding="utf-8") as f:
+        for stack, count in sorted(stacks.items()):
+            f.write(f"{stack} {count}\n")
+
+    with open(report_path, "w", encoding="utf-8") as f:
+        f.write("Stage times (all processes)\n")
+        f.write(f"{'stage':<24}{'calls':>8}{'total s':>12}{'mean s':>12}\n")
+        for stage, (count, total) in sorted(
+            stage_times.items(), key=lambda x: x[1][1], reverse=True
+        ):
+            f.write(f"{stage:<24}{count:>8}{total:>12.3f}{total / count:>12.3f}\n")
+        f.write("\n")
+
+        prof_files = sorted(glob.glob(os.path.join(out_dir, "*_*_*.prof")))
+        if prof_files:
+            stats = pstats.Stats(*prof_files, stream=f)
+            stats.dump_stats(os.path.join(out_dir, "profile_merged.prof"))
+            f.write(f"Top {TOP_FUNCTIONS} functions by cumulative time\n")
+            stats.sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+    return report_path, folded_path